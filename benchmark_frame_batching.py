@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Frame batching and compression throughput benchmark for the PeerLinkyz2 chat wire protocol
+
+Compares the current protocol (one WebSocket Frame.Text per chat message, as sent by
+P2pClient.sendMessage) against coalesced multi-message binary frames using the proposed
+length-prefixed envelope, with and without permessage-deflate (RFC 7692).
+
+Runs against a local WebSocket stand-in (RFC 6455 framing over loopback TCP, stdlib only)
+so it needs neither Tor nor an emulator. See FRAME_BATCHING_PROPOSAL.md for the format.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+
+# WebSocket opcodes (RFC 6455 section 5.2)
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+DEFLATE_TAIL = b"\x00\x00\xff\xff"
+
+# Tor link protocol v4+: 514-byte cells carrying at most 498 bytes of RELAY_DATA
+TOR_CELL_SIZE = 514
+TOR_RELAY_PAYLOAD = 498
+
+# Proposed batch envelope: "PLB" magic, version, u16 count, then u32 length + UTF-8 body per message
+ENVELOPE_MAGIC = b"PLB"
+ENVELOPE_VERSION = 0x01
+ENVELOPE_HEADER = struct.Struct("!3sBH")
+ENVELOPE_LENGTH = struct.Struct("!I")
+ENVELOPE_MAX_COUNT = 0xFFFF
+
+MODES = ["text", "text+deflate", "batch", "batch+deflate"]
+PAYLOADS = ["plaintext", "random"]
+
+# AES/GCM as CryptoManager.encrypt would produce it with encryption enabled: 12-byte IV + ciphertext + tag
+GCM_IV_SIZE = 12
+GCM_TAG_SIZE = 16
+
+# Test vectors for the batch envelope; the benchmark refuses to run if any of these fail
+TEST_VECTORS = [
+    {
+        "name": "single message",
+        "messages": ["FROM:abc.onion hi"],
+        "hex": "504c420100010000001146524f4d3a6162632e6f6e696f6e206869",
+    },
+    {
+        # Generic UTF-8 codec check; not what sendOutboxMessage puts on the wire (see the next vectors)
+        "name": "two messages, generic UTF-8 codec check",
+        "messages": ["FROM:abc.onion héllo", "FROM:abc.onion \U0001f44b"],
+        "hex": "504c420100020000001546524f4d3a6162632e6f6e696f6e2068c3a96c6c6f"
+               "0000001346524f4d3a6162632e6f6e696f6e20f09f918b",
+    },
+    {
+        "name": "empty body and handshake message",
+        "messages": ["", "ECDH_PUBLIC_KEY:AAAA"],
+        "hex": "504c420100020000000000000014454344485f5055424c49435f4b45593a41414141",
+    },
+    {
+        # "héllo 👋" as sendOutboxMessage sends it: UTF-8 bytes decoded as ISO_8859_1, then re-encoded
+        "name": "sendOutboxMessage wire string",
+        "messages": ["FROM:abc.onion " + "héllo \U0001f44b".encode("utf-8").decode("latin-1")],
+        "hex": "504c420100010000002046524f4d3a6162632e6f6e696f6e2068c383c2a96c6c6f"
+               "20c3b0c29fc291c28b",
+    },
+]
+
+# Inputs every decoder must reject
+INVALID_VECTORS = [
+    {"name": "bad magic", "hex": "504c58010001000000026869"},
+    {"name": "unknown version", "hex": "504c42020001000000026869"},
+    {"name": "zero count", "hex": "504c42010000"},
+    {"name": "truncated body", "hex": "504c4201000100000005686869"},
+    {"name": "trailing bytes", "hex": "504c42010001000000026869ff"},
+    {"name": "invalid UTF-8", "hex": "504c4201000100000001ff"},
+]
+
+# permessage-deflate vector: inflating this payload (after appending 00 00 ff ff) must yield
+# the "two messages, generic UTF-8 codec check" envelope. Only decompression is normative, deflaters may differ.
+DEFLATE_VECTOR = {
+    "name": "deflated two-message envelope",
+    "deflated_hex": "0af07162646062606010750bf2f7b54a4c4ad6cbcfcbcccf53c838bc3227271f"
+                    "28218c26f161fec46e0000",
+    "inflates_to": TEST_VECTORS[1]["hex"],
+}
+
+
+def encode_envelope(messages):
+    """Encode a list of chat message strings into one batch envelope"""
+    if not 1 <= len(messages) <= ENVELOPE_MAX_COUNT:
+        raise ValueError(f"Envelope must carry 1..{ENVELOPE_MAX_COUNT} messages, got {len(messages)}")
+    parts = [ENVELOPE_HEADER.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, len(messages))]
+    for message in messages:
+        body = message.encode("utf-8")
+        parts.append(ENVELOPE_LENGTH.pack(len(body)))
+        parts.append(body)
+    return b"".join(parts)
+
+
+def decode_envelope(data):
+    """Decode a batch envelope back into message strings, raising ValueError on malformed input"""
+    if len(data) < ENVELOPE_HEADER.size:
+        raise ValueError("Envelope shorter than header")
+    magic, version, count = ENVELOPE_HEADER.unpack_from(data, 0)
+    if magic != ENVELOPE_MAGIC:
+        raise ValueError(f"Bad envelope magic: {magic!r}")
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported envelope version: {version}")
+    if count == 0:
+        raise ValueError("Envelope carries no messages")
+
+    messages = []
+    offset = ENVELOPE_HEADER.size
+    for _ in range(count):
+        if offset + ENVELOPE_LENGTH.size > len(data):
+            raise ValueError("Truncated length prefix")
+        (length,) = ENVELOPE_LENGTH.unpack_from(data, offset)
+        offset += ENVELOPE_LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("Truncated message body")
+        try:
+            messages.append(data[offset:offset + length].decode("utf-8"))
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Message body is not valid UTF-8: {e}")
+        offset += length
+    if offset != len(data):
+        raise ValueError(f"{len(data) - offset} trailing bytes after envelope")
+    return messages
+
+
+class Deflater:
+    """permessage-deflate sender side (RFC 7692 section 7.2.1)"""
+
+    def __init__(self, context_takeover=True, level=6):
+        self.context_takeover = context_takeover
+        self.level = level
+        self._compressor = self._new()
+
+    def _new(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if not self.context_takeover:
+            self._compressor = self._new()
+        out = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return out[:-len(DEFLATE_TAIL)] if out.endswith(DEFLATE_TAIL) else out
+
+
+class Inflater:
+    """permessage-deflate receiver side (RFC 7692 section 7.2.2)"""
+
+    def __init__(self, context_takeover=True):
+        self.context_takeover = context_takeover
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        if not self.context_takeover:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(data + DEFLATE_TAIL)
+
+
+def _apply_mask(data, key):
+    if not data:
+        return data
+    repeated = (key * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(data), "big")
+
+
+def encode_frame(opcode, payload, rsv1=False, mask=True):
+    """Encode a single unfragmented WebSocket frame; clients must mask, servers must not"""
+    first = 0x80 | (0x40 if rsv1 else 0) | opcode
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", first, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", first, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", first, mask_bit | 127, length)
+    if mask:
+        key = os.urandom(4)
+        return header + key + _apply_mask(payload, key)
+    return header + payload
+
+
+async def read_frame(reader):
+    """Read one WebSocket frame, returning (opcode, rsv1, payload, wire_bytes), or None on EOF between frames"""
+    try:
+        first, second = await reader.readexactly(2)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    wire_bytes = 2
+    if not first & 0x80:
+        raise ValueError("Fragmented frames are not used by this protocol")
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+        wire_bytes += 2
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+        wire_bytes += 8
+    key = None
+    if second & 0x80:
+        key = await reader.readexactly(4)
+        wire_bytes += 4
+    payload = await reader.readexactly(length)
+    if key:
+        payload = _apply_mask(payload, key)
+    return first & 0x0F, bool(first & 0x40), payload, wire_bytes + length
+
+
+def _accept_key(client_key):
+    digest = hashlib.sha1((client_key + WS_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+async def _read_http_head(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers, len(head)
+
+
+def _spin(microseconds):
+    """Busy-wait to emulate fixed per-frame CPU cost (log calls, channel hand-off)"""
+    if microseconds <= 0:
+        return
+    deadline = time.perf_counter() + microseconds / 1_000_000
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StandInServer:
+    """Local stand-in for the P2pManager /chat WebSocket endpoint, running on its own thread"""
+
+    def __init__(self, per_frame_overhead_us=0, context_takeover=True):
+        self.per_frame_overhead_us = per_frame_overhead_us
+        self.context_takeover = context_takeover
+        self.receive_times = []
+        self.received_messages = []
+        self.frames = 0
+        self.wire_bytes = 0
+        self.error = None
+        self.port = None
+        self._ready = threading.Event()
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        finished = asyncio.Event()
+
+        async def handle(reader, writer):
+            try:
+                await self._handle(reader, writer)
+            except ConnectionResetError:
+                # The client went away, usually because it failed itself; run_mode reports that error
+                pass
+            except Exception as e:
+                self.error = e
+            finally:
+                writer.close()
+                finished.set()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await finished.wait()
+        self.done.set()
+
+    async def _handle(self, reader, writer):
+        request_line, headers, _ = await _read_http_head(reader)
+        if not request_line.startswith("GET /chat "):
+            raise ValueError(f"Unexpected request: {request_line}")
+        deflate = "permessage-deflate" in headers.get("sec-websocket-extensions", "")
+        response = [
+            "HTTP/1.1 101 Switching Protocols",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Accept: {_accept_key(headers['sec-websocket-key'])}",
+        ]
+        if deflate:
+            extension = "permessage-deflate"
+            if not self.context_takeover:
+                extension += "; client_no_context_takeover; server_no_context_takeover"
+            response.append(f"Sec-WebSocket-Extensions: {extension}")
+        writer.write(("\r\n".join(response) + "\r\n\r\n").encode("ascii"))
+        await writer.drain()
+
+        inflater = Inflater(self.context_takeover) if deflate else None
+        while True:
+            frame = await read_frame(reader)
+            if frame is None:
+                # Disconnected without a close frame; run_mode reports the client's error or missing messages
+                return
+            opcode, rsv1, payload, wire_bytes = frame
+            if opcode == OP_CLOSE:
+                writer.write(encode_frame(OP_CLOSE, payload, mask=False))
+                await writer.drain()
+                return
+            self.frames += 1
+            self.wire_bytes += wire_bytes
+            _spin(self.per_frame_overhead_us)
+            if rsv1:
+                if inflater is None:
+                    raise ValueError("Compressed frame without negotiated permessage-deflate")
+                payload = inflater.decompress(payload)
+            if opcode == OP_TEXT:
+                messages = [payload.decode("utf-8")]
+            elif opcode == OP_BINARY:
+                messages = decode_envelope(payload)
+            else:
+                continue
+            now = time.perf_counter()
+            for message in messages:
+                self.receive_times.append(now)
+                self.received_messages.append(message)
+
+
+def _onion_address(rng):
+    alphabet = "abcdefghijklmnopqrstuvwxyz234567"
+    return "".join(rng.choice(alphabet) for _ in range(56)) + ".onion"
+
+
+_WORDS = ("hey", "ok", "see", "you", "later", "tonight", "did", "the", "build", "pass", "tor",
+          "circuit", "finally", "connected", "message", "sent", "thanks", "sure", "lol", "what",
+          "about", "tomorrow", "meeting", "at", "noon", "cool", "sounds", "good", "été",
+          "\U0001f44d", "onion", "key", "exchange", "complete", "again", "please", "retry")
+
+
+def build_schedule(bursts, mean_burst, burst_gap_ms, seed, payload="plaintext"):
+    """Build bursty outbox flushes: (offset_seconds, [wire messages]) per flush
+
+    With payload="random" each body is replaced by random bytes the size of its AES/GCM ciphertext,
+    standing in for CryptoManager.encrypt once encryption is re-enabled.
+    """
+    rng = random.Random(seed)
+    # Separate stream so both payload modes replay the same flush sizes and message lengths
+    cipher_rng = random.Random(f"ciphertext-{seed}")
+    sender = _onion_address(rng)
+    schedule = []
+    for index in range(bursts):
+        size = max(1, int(rng.expovariate(1 / mean_burst)))
+        messages = []
+        for _ in range(size):
+            words = min(80, max(1, int(rng.lognormvariate(1.8, 0.8))))
+            text = " ".join(rng.choice(_WORDS) for _ in range(words))
+            # ChatActivity.sendOutboxMessage decodes the stored UTF-8 bytes as ISO_8859_1 before
+            # sending, so non-ASCII text goes out double-encoded; replay that exact wire string
+            stored = text.encode("utf-8")
+            if payload == "random":
+                stored = cipher_rng.randbytes(GCM_IV_SIZE + len(stored) + GCM_TAG_SIZE)
+            body = stored.decode("latin-1")
+            messages.append(f"FROM:{sender} {body}")
+        schedule.append((index * burst_gap_ms / 1000, messages))
+    return schedule
+
+
+def plan_batches(messages, max_messages, max_bytes):
+    """Split one outbox flush into envelopes bounded by message count and encoded size"""
+    batch, size = [], ENVELOPE_HEADER.size
+    for message in messages:
+        needed = ENVELOPE_LENGTH.size + len(message.encode("utf-8"))
+        if batch and (len(batch) >= max_messages or size + needed > max_bytes):
+            yield batch
+            batch, size = [], ENVELOPE_HEADER.size
+        batch.append(message)
+        size += needed
+    if batch:
+        yield batch
+
+
+async def _run_client(port, mode, schedule, args, stats):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        await _drive_client(reader, writer, port, mode, schedule, args, stats)
+    finally:
+        # Always close so the stand-in sees EOF and its thread exits, even if the client failed
+        writer.close()
+
+
+async def _drive_client(reader, writer, port, mode, schedule, args, stats):
+    batched = mode.startswith("batch")
+    deflate = mode.endswith("+deflate")
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    request = [
+        "GET /chat HTTP/1.1",
+        f"Host: 127.0.0.1:{port}",
+        "Upgrade: websocket",
+        "Connection: Upgrade",
+        f"Sec-WebSocket-Key: {key}",
+        "Sec-WebSocket-Version: 13",
+    ]
+    if deflate:
+        extension = "permessage-deflate"
+        if args.no_context_takeover:
+            extension += "; client_no_context_takeover; server_no_context_takeover"
+        request.append(f"Sec-WebSocket-Extensions: {extension}")
+    head = ("\r\n".join(request) + "\r\n\r\n").encode("ascii")
+    writer.write(head)
+    await writer.drain()
+    status_line, headers, response_bytes = await _read_http_head(reader)
+    if " 101 " not in status_line or headers.get("sec-websocket-accept") != _accept_key(key):
+        raise ValueError(f"WebSocket handshake failed: {status_line}")
+    stats["handshake_bytes"] = len(head) + response_bytes
+
+    deflater = Deflater(not args.no_context_takeover, args.deflate_level) if deflate else None
+    frame_sizes = []
+    enqueue_times = []
+
+    async def send(opcode, payload):
+        _spin(args.per_frame_overhead_us)
+        rsv1 = False
+        if deflater is not None:
+            payload = deflater.compress(payload)
+            rsv1 = True
+        frame = encode_frame(opcode, payload, rsv1=rsv1)
+        frame_sizes.append(len(frame))
+        writer.write(frame)
+        # Ktor's send suspends until the frame is handed to the transport; mirror that per frame
+        await writer.drain()
+
+    t0 = time.perf_counter()
+    for offset, messages in schedule:
+        delay = t0 + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # processOutbox picks up the whole flush at once, so every message is enqueued at the
+        # scheduled time; falling behind shows up as queueing delay in the tail latency
+        enqueue_times.extend([t0 + offset] * len(messages))
+        if batched:
+            for batch in plan_batches(messages, args.max_batch_messages, args.max_batch_bytes):
+                await send(OP_BINARY, encode_envelope(batch))
+        else:
+            for message in messages:
+                await send(OP_TEXT, message.encode("utf-8"))
+
+    writer.write(encode_frame(OP_CLOSE, struct.pack("!H", 1000)))
+    await writer.drain()
+    await read_frame(reader)
+    stats["frame_sizes"] = frame_sizes
+    stats["enqueue_times"] = enqueue_times
+    stats["t0"] = t0
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_mode(mode, schedule, args):
+    """Run one protocol variant over the stand-in and summarize throughput, size and latency"""
+    messages = [message for _, burst in schedule for message in burst]
+    server = StandInServer(args.per_frame_overhead_us, not args.no_context_takeover)
+    server.start()
+    stats = {}
+    client_error = None
+    try:
+        asyncio.run(_run_client(server.port, mode, schedule, args, stats))
+    except Exception as e:
+        # A failing stand-in closes the socket, which surfaces here as a reset or short read;
+        # hold on to it so the server's own error is reported first
+        client_error = e
+    server.done.wait(timeout=60)
+    server.join(timeout=5)
+    if server.error:
+        raise server.error from client_error
+    if client_error:
+        raise client_error
+    if server.received_messages != messages:
+        raise ValueError(f"{mode}: received {len(server.received_messages)} of {len(messages)} "
+                         f"messages or they arrived altered")
+
+    latencies = sorted((received - enqueued) * 1000
+                       for received, enqueued in zip(server.receive_times, stats["enqueue_times"]))
+    duration = server.receive_times[-1] - stats["t0"]
+    payload_bytes = sum(len(message.encode("utf-8")) for message in messages)
+    wire_bytes = sum(stats["frame_sizes"])
+    tor_cells = sum(math.ceil(size / TOR_RELAY_PAYLOAD) for size in stats["frame_sizes"])
+    return {
+        "mode": mode,
+        "messages": len(messages),
+        "frames": len(stats["frame_sizes"]),
+        "payload_bytes": payload_bytes,
+        "wire_bytes": wire_bytes,
+        "wire_bytes_per_message": wire_bytes / len(messages),
+        "handshake_bytes": stats["handshake_bytes"],
+        "tor_cells_est": tor_cells,
+        "tor_bytes_est": tor_cells * TOR_CELL_SIZE,
+        "duration_s": duration,
+        "messages_per_sec": len(messages) / duration if duration > 0 else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": latencies[-1],
+        },
+    }
+
+
+def verify_test_vectors():
+    """Check the envelope codec against the published test vectors"""
+    failures = []
+    for vector in TEST_VECTORS:
+        expected = bytes.fromhex(vector["hex"])
+        if encode_envelope(vector["messages"]) != expected:
+            failures.append(f"encode: {vector['name']}")
+        elif decode_envelope(expected) != vector["messages"]:
+            failures.append(f"decode: {vector['name']}")
+    for vector in INVALID_VECTORS:
+        try:
+            decode_envelope(bytes.fromhex(vector["hex"]))
+            failures.append(f"accepted invalid: {vector['name']}")
+        except ValueError:
+            pass
+    inflated = Inflater().decompress(bytes.fromhex(DEFLATE_VECTOR["deflated_hex"]))
+    if inflated != bytes.fromhex(DEFLATE_VECTOR["inflates_to"]):
+        failures.append(f"inflate: {DEFLATE_VECTOR['name']}")
+    return failures
+
+
+def print_report(results):
+    baseline = results[0]
+    print("\n" + "=" * 96)
+    print("📊 FRAME BATCHING BENCHMARK")
+    print("=" * 96)
+    print(f"{'mode':<15}{'frames':>8}{'wire B':>10}{'B/msg':>8}{'tor cells':>11}"
+          f"{'msg/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for result in results:
+        latency = result["latency_ms"]
+        print(f"{result['mode']:<15}{result['frames']:>8}{result['wire_bytes']:>10}"
+              f"{result['wire_bytes_per_message']:>8.1f}{result['tor_cells_est']:>11}"
+              f"{result['messages_per_sec']:>11.0f}{latency['p50']:>9.2f}{latency['p95']:>9.2f}"
+              f"{latency['p99']:>9.2f}{latency['max']:>9.2f}")
+    print("-" * 96)
+    for result in results[1:]:
+        print(f"{result['mode']:<15} wire bytes {result['wire_bytes'] / baseline['wire_bytes']:.2f}x, "
+              f"tor cells {result['tor_cells_est'] / baseline['tor_cells_est']:.2f}x, "
+              f"p99 {result['latency_ms']['p99'] / max(baseline['latency_ms']['p99'], 1e-9):.2f}x "
+              f"vs {baseline['mode']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--bursts", type=int, default=200, help="number of outbox flushes")
+    parser.add_argument("--mean-burst", type=float, default=20, help="mean messages per flush")
+    parser.add_argument("--burst-gap-ms", type=float, default=20, help="time between flushes")
+    parser.add_argument("--per-frame-overhead-us", type=float, default=0,
+                        help="fixed CPU cost per frame on each side (emulates logging / Tor cell scheduling)")
+    parser.add_argument("--max-batch-messages", type=int, default=64)
+    parser.add_argument("--max-batch-bytes", type=int, default=16 * 1024)
+    parser.add_argument("--deflate-level", type=int, default=6)
+    parser.add_argument("--no-context-takeover", action="store_true",
+                        help="reset the deflate window for every frame")
+    parser.add_argument("--payload", choices=PAYLOADS, default="plaintext",
+                        help="message bodies: chat text as sent today, or random bytes standing in for AES/GCM ciphertext")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    if args.bursts < 1:
+        parser.error("--bursts must be at least 1")
+    if args.mean_burst <= 0:
+        parser.error("--mean-burst must be greater than 0")
+    if not 1 <= args.max_batch_messages <= ENVELOPE_MAX_COUNT:
+        parser.error(f"--max-batch-messages must be between 1 and {ENVELOPE_MAX_COUNT}")
+    if not -1 <= args.deflate_level <= 9:
+        parser.error("--deflate-level must be between -1 (zlib default) and 9")
+
+    print("\n🧪 Verifying envelope test vectors...")
+    failures = verify_test_vectors()
+    if failures:
+        for failure in failures:
+            print(f"❌ FAIL: {failure}")
+        return 1
+    print(f"✅ PASS: {len(TEST_VECTORS)} valid, {len(INVALID_VECTORS)} invalid, 1 deflate vector")
+
+    schedule = build_schedule(args.bursts, args.mean_burst, args.burst_gap_ms, args.seed, args.payload)
+    total = sum(len(burst) for _, burst in schedule)
+    print(f"\n📨 {len(schedule)} outbox flushes, {total} {args.payload} messages, "
+          f"{args.per_frame_overhead_us:g}us per-frame overhead")
+
+    results = []
+    for mode in args.modes:
+        print(f"⏱️  Running {mode}...")
+        results.append(run_mode(mode, schedule, args))
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"\n📄 Detailed results saved to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())